@@ -0,0 +1,7 @@
+"""Benchmarks for the DatabaseManager layer.
+
+Run from the project root:
+
+    python -m benchmarks.synthetic_data --preset small
+    python -m benchmarks.bench_db_utils --preset small
+"""
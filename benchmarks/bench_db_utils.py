@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""Micro-benchmarks for DatabaseManager against a synthetic database."""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from db_utils import DatabaseManager, shard_paths
+from rebalance_shards import rebalance
+from benchmarks.synthetic_data import (
+    DEFAULT_DB_PATH, PRESETS, PROJECT_ROOT, generate, load_problem_numbers
+)
+
+RESULTS_DIR = os.path.join(PROJECT_ROOT, "benchmarks", "results")
+
+READ_METHODS = ["get_user", "get_user_stats", "get_chat_history", "get_challenging_problems"]
+WRITE_METHODS = ["log_attempt", "log_chat"]
+
+
+def _summarize(latencies: List[float], wall_time: float, errors: int = 0) -> Dict:
+    """Summarize per-call latencies (seconds) into milliseconds"""
+    ordered = sorted(latencies)
+    ms = [x * 1000 for x in ordered]
+    return {
+        "calls": len(ms),
+        "errors": errors,
+        "wall_time_s": wall_time,
+        "ops_per_s": len(ms) / wall_time if wall_time > 0 else 0,
+        "mean_ms": statistics.fmean(ms) if ms else 0,
+        "median_ms": statistics.median(ms) if ms else 0,
+        "p95_ms": ms[int(0.95 * (len(ms) - 1))] if ms else 0,
+        "min_ms": ms[0] if ms else 0,
+        "max_ms": ms[-1] if ms else 0,
+    }
+
+
+def _make_call(db: DatabaseManager, method: str, rng: random.Random,
+               users: int, problems: List[int]) -> Callable[[], object]:
+    """Build a zero-argument call to `method` with random but seeded arguments"""
+    user_id = rng.randint(1, users)
+    problem = rng.choice(problems)
+    if method == "get_user":
+        return lambda: db.get_user(f"user_{user_id}")
+    if method == "log_attempt":
+        answer = str(rng.randint(0, 100))
+        return lambda: db.log_attempt(user_id, problem, answer, rng.random() < 0.5)
+    if method == "log_chat":
+        return lambda: db.log_chat(user_id, problem, "user", "Benchmark message")
+    return lambda: getattr(db, method)(user_id)
+
+
+def bench_single(db: DatabaseManager, method: str, iterations: int, users: int,
+                 problems: List[int], seed: int, warmup: int = 3) -> Dict:
+    """Time `iterations` sequential calls of one method"""
+    rng = random.Random(seed)
+    for _ in range(warmup):
+        _make_call(db, method, rng, users, problems)()
+
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        call = _make_call(db, method, rng, users, problems)
+        t0 = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - t0)
+    return _summarize(latencies, time.perf_counter() - start)
+
+
+def bench_threaded(db: DatabaseManager, method: str, threads: int, iterations: int,
+                   users: int, problems: List[int], seed: int) -> Dict:
+    """Run `threads` concurrent writers, each making `iterations` calls"""
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(worker_seed: int):
+        rng = random.Random(worker_seed)
+        local = []
+        local_errors = 0
+        barrier.wait()
+        for _ in range(iterations):
+            call = _make_call(db, method, rng, users, problems)
+            t0 = time.perf_counter()
+            try:
+                call()
+            except sqlite3.OperationalError:
+                # "database is locked" once the busy timeout expires
+                local_errors += 1
+                continue
+            local.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    workers = [threading.Thread(target=worker, args=(seed + i,)) for i in range(threads)]
+    for w in workers:
+        w.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for w in workers:
+        w.join()
+    result = _summarize(latencies, time.perf_counter() - start, errors[0])
+    result["threads"] = threads
+    return result
+
+
+def _table_counts(db_path: str) -> Dict[str, int]:
+    with sqlite3.connect(db_path) as conn:
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            for table in ("users", "problem_attempts", "chat_history", "user_stats")
+        }
+
+
+def _git_info() -> Dict[str, Optional[str]]:
+    def run(*args):
+        try:
+            return subprocess.check_output(
+                ["git", *args], cwd=PROJECT_ROOT, stderr=subprocess.DEVNULL, text=True
+            ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    status = run("status", "--porcelain", "--untracked-files=no")
+    return {
+        "commit": run("rev-parse", "HEAD"),
+        "branch": run("rev-parse", "--abbrev-ref", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+    }
+
+
+def sharded_copy(db_path: str, num_shards: int) -> str:
+    """Get (creating on first use) a sharded copy of the synthetic database"""
+    root, ext = os.path.splitext(db_path)
+    dest = f"{root}-{num_shards}shards{ext}"
+    if os.path.exists(dest) and os.path.getmtime(dest) < os.path.getmtime(db_path):
+        # The synthetic database was regenerated since the copy was made
+        for path in [dest] + shard_paths(dest, num_shards):
+            if os.path.exists(path):
+                os.remove(path)
+    if not os.path.exists(dest):
+        print(f"Splitting {db_path} into {num_shards} shards")
+        rebalance(db_path, dest, num_shards).close()
+    return dest
+
+
+def _scratch_copy(db_path: str, num_shards: int) -> str:
+    """Copy a database (and its shards) into a temporary directory next to it"""
+    scratch_dir = tempfile.mkdtemp(prefix="scratch-", dir=os.path.dirname(db_path))
+    paths = [db_path] + (shard_paths(db_path, num_shards) if num_shards > 1 else [])
+    for path in paths:
+        shutil.copyfile(path, os.path.join(scratch_dir, os.path.basename(path)))
+    return os.path.join(scratch_dir, os.path.basename(db_path))
+
+
+def run_benchmarks(db_path: str, iterations: int, write_iterations: int,
+                   thread_counts: List[int], methods: List[str], seed: int = 0,
+                   num_shards: int = 1) -> Dict:
+    """Run the suite and return a JSON-serializable result document"""
+    counts = _table_counts(db_path)
+    users = counts["users"]
+    problems = load_problem_numbers()
+    # DatabaseManager reads schema.sql relative to the working directory
+    os.chdir(PROJECT_ROOT)
+    bench_path = sharded_copy(db_path, num_shards) if num_shards > 1 else db_path
+
+    # Writes go to a throwaway copy so every run sees the same dataset
+    scratch_path = None
+    if any(m in WRITE_METHODS for m in methods):
+        print(f"Copying {bench_path} for write benchmarks")
+        scratch_path = _scratch_copy(bench_path, num_shards)
+        bench_path = scratch_path
+
+    try:
+        with DatabaseManager(bench_path, num_shards=num_shards) as db:
+            results = _run_methods(db, methods, iterations, write_iterations,
+                                   thread_counts, users, problems, seed)
+    finally:
+        if scratch_path:
+            shutil.rmtree(os.path.dirname(scratch_path), ignore_errors=True)
+
+    return {
+        "metadata": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git": _git_info(),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "db_path": os.path.abspath(db_path),
+            "row_counts": counts,
+            "num_shards": num_shards,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def _run_methods(db: DatabaseManager, methods: List[str], iterations: int, write_iterations: int,
+                 thread_counts: List[int], users: int, problems: List[int], seed: int) -> Dict:
+    """Run the single- and multi-threaded benchmarks for each method"""
+    results = {"single_threaded": {}, "multi_threaded": {}}
+    for method in methods:
+        print(f"  {method} (single-threaded)")
+        n = write_iterations if method in WRITE_METHODS else iterations
+        results["single_threaded"][method] = bench_single(db, method, n, users, problems, seed)
+
+    for method in [m for m in methods if m in WRITE_METHODS]:
+        results["multi_threaded"][method] = {}
+        for threads in thread_counts:
+            print(f"  {method} ({threads} writer threads)")
+            results["multi_threaded"][method][str(threads)] = bench_threaded(
+                db, method, threads, write_iterations, users, problems, seed
+            )
+
+    return results
+
+
+def compare(baseline: Dict, current: Dict):
+    """Print median latency changes between two result documents"""
+    print(f"{'benchmark':<40} {'base ms':>10} {'new ms':>10} {'change':>8}")
+    for section in ("single_threaded", "multi_threaded"):
+        base_section = baseline["results"].get(section, {})
+        for method, entry in current["results"].get(section, {}).items():
+            pairs = [(method, entry, base_section.get(method))]
+            if section == "multi_threaded":
+                pairs = [(f"{method} x{t}", e, base_section.get(method, {}).get(t))
+                         for t, e in entry.items()]
+            for name, new, old in pairs:
+                if not old:
+                    continue
+                change = (new["median_ms"] / old["median_ms"] - 1) * 100 if old["median_ms"] else 0
+                print(f"{name:<40} {old['median_ms']:>10.3f} {new['median_ms']:>10.3f} {change:>+7.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="synthetic database path")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small",
+                        help="dataset size to generate if --db does not exist")
+    parser.add_argument("--regenerate", action="store_true",
+                        help="rebuild the synthetic database before running")
+    parser.add_argument("--iterations", type=int, default=50, help="calls per read benchmark")
+    parser.add_argument("--write-iterations", type=int, default=200,
+                        help="calls per write benchmark (per thread when threaded)")
+    parser.add_argument("--threads", default="1,2,4,8", help="comma-separated writer thread counts")
+    parser.add_argument("--methods", default=",".join(READ_METHODS + WRITE_METHODS))
+    parser.add_argument("--shards", type=int, default=1,
+                        help="benchmark a copy of the database split into this many shards")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="result JSON path (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", metavar="BASELINE_JSON", help="print changes against a previous result")
+    args = parser.parse_args()
+
+    db_path = os.path.abspath(args.db)
+    if args.regenerate or not os.path.exists(db_path):
+        print(f"Generating {args.preset} dataset at {db_path}")
+        generate(db_path, seed=args.seed, **PRESETS[args.preset])
+
+    print(f"Benchmarking {db_path}")
+    document = run_benchmarks(
+        db_path,
+        iterations=args.iterations,
+        write_iterations=args.write_iterations,
+        thread_counts=[int(t) for t in args.threads.split(",")],
+        methods=args.methods.split(","),
+        seed=args.seed,
+        num_shards=args.shards,
+    )
+
+    output = args.output
+    if not output:
+        commit = (document["metadata"]["git"]["commit"] or "nogit")[:10]
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{commit}-{stamp}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"Results written to {output}")
+
+    for method, stats in document["results"]["single_threaded"].items():
+        print(f"  {method:<26} median {stats['median_ms']:8.3f} ms  p95 {stats['p95_ms']:8.3f} ms")
+    for method, by_threads in document["results"]["multi_threaded"].items():
+        for threads, stats in by_threads.items():
+            print(f"  {method + ' x' + threads:<26} {stats['ops_per_s']:8.1f} ops/s  errors {stats['errors']}")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(json.load(f), document)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""Generate a large synthetic database using the real schema."""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import time
+from typing import Dict, Iterator, List, Tuple
+
+from db_utils import DatabaseManager
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_PATH = os.path.join(PROJECT_ROOT, "benchmarks", "data", "bench.db")
+
+# Sizes from the request: 100k users, 10M attempts, 20M chat messages
+PRESETS: Dict[str, Dict[str, int]] = {
+    "tiny": {"users": 100, "attempts": 10_000, "chats": 20_000},
+    "small": {"users": 1_000, "attempts": 100_000, "chats": 200_000},
+    "medium": {"users": 10_000, "attempts": 1_000_000, "chats": 2_000_000},
+    "large": {"users": 100_000, "attempts": 10_000_000, "chats": 20_000_000},
+}
+
+BATCH_SIZE = 50_000
+# All generated timestamps fall within a year starting here (unix seconds)
+BASE_TIMESTAMP = 1_704_067_200  # 2024-01-01
+TIME_SPAN = 365 * 24 * 3600
+
+CHAT_MESSAGES = [
+    "I think the answer is 1.",
+    "Can I get a hint?",
+    "Is it 4047?",
+    "Close! Remember the difference of squares formula.",
+    "Great job, that's correct!",
+    "Try factoring the expression first.",
+    "I'm not sure how to start this one.",
+    "Check your arithmetic in the second step.",
+]
+
+
+def load_problem_numbers() -> List[int]:
+    """Get the problem numbers defined in problems.json"""
+    with open(os.path.join(PROJECT_ROOT, "problems.json"), "r") as f:
+        return [p["problem_number"] for p in json.load(f)["problems"]]
+
+
+def _batched(rows: Iterator[Tuple], size: int = BATCH_SIZE) -> Iterator[List[Tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _user_rows(count: int) -> Iterator[Tuple]:
+    for i in range(1, count + 1):
+        yield (i, f"user_{i}")
+
+
+def _attempt_rows(rng: random.Random, count: int, users: int,
+                  problems: List[int]) -> Iterator[Tuple]:
+    for _ in range(count):
+        # Wrong answers cluster on a few values, like real mistakes do
+        answer = str(int(rng.paretovariate(1.2)))
+        is_correct = rng.random() < 0.4
+        yield (rng.randint(1, users), rng.choice(problems), answer, is_correct,
+               BASE_TIMESTAMP + rng.randrange(TIME_SPAN))
+
+
+def _chat_rows(rng: random.Random, count: int, users: int,
+               problems: List[int]) -> Iterator[Tuple]:
+    for i in range(count):
+        yield (rng.randint(1, users), rng.choice(problems),
+               "user" if i % 2 == 0 else "assistant", rng.choice(CHAT_MESSAGES),
+               BASE_TIMESTAMP + rng.randrange(TIME_SPAN))
+
+
+def generate(db_path: str, users: int, attempts: int, chats: int,
+             seed: int = 0) -> Dict[str, float]:
+    """Create a synthetic database at db_path and return timings in seconds"""
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+    # Let DatabaseManager create the schema so we always benchmark the real one
+    cwd = os.getcwd()
+    os.chdir(PROJECT_ROOT)
+    try:
+        DatabaseManager(db_path)
+    finally:
+        os.chdir(cwd)
+
+    rng = random.Random(seed)
+    problems = load_problem_numbers()
+    timings = {}
+
+    with sqlite3.connect(db_path) as conn:
+        # Durability is irrelevant for a throwaway dataset
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+
+        start = time.perf_counter()
+        for batch in _batched(_user_rows(users)):
+            conn.executemany("INSERT INTO users (id, name) VALUES (?, ?)", batch)
+        timings["users"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for batch in _batched(_attempt_rows(rng, attempts, users, problems)):
+            conn.executemany("""
+                INSERT INTO problem_attempts (user_id, problem_number, answer, is_correct, created_at)
+                VALUES (?, ?, ?, ?, datetime(?, 'unixepoch'))
+            """, batch)
+        timings["problem_attempts"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for batch in _batched(_chat_rows(rng, chats, users, problems)):
+            conn.executemany("""
+                INSERT INTO chat_history (user_id, problem_number, role, content, created_at)
+                VALUES (?, ?, ?, ?, datetime(?, 'unixepoch'))
+            """, batch)
+        timings["chat_history"] = time.perf_counter() - start
+
+        # Keep user_stats consistent with the generated attempts
+        start = time.perf_counter()
+        conn.execute("""
+            INSERT INTO user_stats (user_id, problem_number, total_attempts, correct_attempts, last_attempt_at)
+            SELECT user_id, problem_number, COUNT(*), SUM(is_correct), MAX(created_at)
+            FROM problem_attempts
+            GROUP BY user_id, problem_number
+        """)
+        timings["user_stats"] = time.perf_counter() - start
+
+        conn.commit()
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="output database path")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    parser.add_argument("--users", type=int, help="override preset user count")
+    parser.add_argument("--attempts", type=int, help="override preset problem_attempts count")
+    parser.add_argument("--chats", type=int, help="override preset chat_history count")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sizes = dict(PRESETS[args.preset])
+    for key in ("users", "attempts", "chats"):
+        if getattr(args, key) is not None:
+            sizes[key] = getattr(args, key)
+
+    print(f"Generating {args.db}: {sizes}")
+    timings = generate(args.db, seed=args.seed, **sizes)
+    for table, seconds in timings.items():
+        print(f"  {table:<18} {seconds:8.2f}s")
+
+
+if __name__ == "__main__":
+    main()
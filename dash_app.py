@@ -6,6 +6,8 @@ import os
 from openai import OpenAI
 from dotenv import load_dotenv
 from db_utils import DatabaseManager
+from feedback_bank import answer_from_bank
+from profiling import Profiler
 
 # Load environment variables
 load_dotenv(override=True)  # Add override=True to force it to take precedence
@@ -18,7 +20,8 @@ if not api_key:
 
 # Initialize OpenAI client and database
 client = OpenAI(api_key=api_key)
-db = DatabaseManager()
+db = DatabaseManager(num_shards=int(os.getenv("DB_SHARDS", "1")))
+profiler = Profiler.from_env()
 
 # Initialize the Dash app with external stylesheets
 app = dash.Dash(__name__, 
@@ -83,6 +86,9 @@ app.index_string = '''
 
 app.title = "Math Tutor Dashboard"
 
+# Slowest profiled requests are listed at /_profiles when profiling is enabled
+profiler.register_routes(app.server)
+
 # Load problems from JSON file
 with open("problems.json", "r") as f:
     problems_data = json.load(f)["problems"]
@@ -382,6 +388,7 @@ app.layout = html.Div([
     [Input('login-button', 'n_clicks')],
     [State('username-input', 'value')]
 )
+@profiler.callback
 def handle_login(n_clicks, username):
     if not n_clicks or not username:
         return (
@@ -434,6 +441,7 @@ def handle_login(n_clicks, username):
      State("store-state", "data")],
     prevent_initial_call=True
 )
+@profiler.callback
 def submit_answer(n_clicks, answer, data):
     if not n_clicks:
         return ""
@@ -451,8 +459,11 @@ def submit_answer(n_clicks, answer, data):
     if not answer:
         return html.Div("Please enter an answer.", style={"color": "#ffc107"})
 
-    # Get AI tutor feedback with RAG
-    feedback = evaluate_answer(user_id, prob, answer)
+    # Common wrong answers are served from the feedback bank without an API call
+    feedback = answer_from_bank(db, user_id, current, answer)
+    if not feedback:
+        # Get AI tutor feedback with RAG
+        feedback = evaluate_answer(user_id, prob, answer)
     
     # Determine if the answer is correct (basic check)
     is_correct = any(str(answer).strip() in sol["solution"] for sol in prob["solutions"])
@@ -473,6 +484,7 @@ def submit_answer(n_clicks, answer, data):
     Output("problem-area", "children"),
     Input("store-state", "data")
 )
+@profiler.callback
 def update_problem(data):
     current = data.get("current_problem", 1)
     prob = get_problem(current)
@@ -486,6 +498,7 @@ def update_problem(data):
     Output("progress-indicator", "children"),
     Input("store-state", "data")
 )
+@profiler.callback
 def update_progress(data):
     current = data.get("current_problem", 1)
     total = len(problems_data)
@@ -498,6 +511,7 @@ def update_progress(data):
     State("store-state", "data"),
     prevent_initial_call=True
 )
+@profiler.callback
 def get_hint(n_clicks, data):
     if not n_clicks:
         return "", data
@@ -550,6 +564,7 @@ def get_hint(n_clicks, data):
     State("store-state", "data"),
     prevent_initial_call=True
 )
+@profiler.callback
 def see_solution(n_clicks, data):
     if not n_clicks:
         return ""
@@ -588,6 +603,7 @@ def see_solution(n_clicks, data):
     State("store-state", "data"),
     prevent_initial_call=True
 )
+@profiler.callback
 def next_problem(n_clicks, data):
     if not n_clicks:
         return data, "", "", ""
@@ -1,12 +1,54 @@
+import os
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from typing import Dict, List, Optional, Tuple
 
+# Each shard allocates row ids from its own range so ids stay globally unique
+SHARD_ID_BITS = 48
+SHARDED_TABLES = ["problem_attempts", "chat_history", "user_stats"]
+
+
+def shard_paths(db_path: str, num_shards: int) -> List[str]:
+    """Get the shard file paths for a sharded database rooted at db_path"""
+    root, ext = os.path.splitext(db_path)
+    return [f"{root}.shard{i:02d}{ext}" for i in range(num_shards)]
+
+
+def stored_shard_count(db_path: str) -> int:
+    """Get the shard count recorded in a database, 1 if it is not sharded"""
+    with sqlite3.connect(db_path) as conn:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'shard_config'"
+        ).fetchone()
+        row = conn.execute("SELECT num_shards FROM shard_config").fetchone() if exists else None
+        return row[0] if row else 1
+
+
 class DatabaseManager:
-    def __init__(self, db_path: str = "user_data.db"):
+    def __init__(self, db_path: str = "user_data.db", num_shards: int = 1):
+        """With num_shards > 1, db_path only holds users and per-user data
+        is spread over num_shards files routed by user_id"""
+        if num_shards < 1:
+            raise ValueError("num_shards must be at least 1")
         self.db_path = db_path
+        self.num_shards = num_shards
+        self.shard_paths = shard_paths(db_path, num_shards) if num_shards > 1 else [db_path]
+        self._executor = ThreadPoolExecutor(max_workers=num_shards) if num_shards > 1 else None
         self.init_db()
 
+    def close(self):
+        """Shut down the shard fan-out thread pool"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def init_db(self):
         """Initialize the database with schema"""
         with open('schema.sql', 'r') as f:
@@ -15,6 +57,55 @@ class DatabaseManager:
         with sqlite3.connect(self.db_path) as conn:
             conn.executescript(schema)
 
+        self._check_shard_config()
+        if self.num_shards > 1:
+            for index, path in enumerate(self.shard_paths):
+                with sqlite3.connect(path) as conn:
+                    conn.executescript(schema)
+                    reserve_shard_ids(conn, index)
+
+    def _check_shard_config(self):
+        """Record the shard count and refuse to open with a different one"""
+        stored = stored_shard_count(self.db_path)
+        if stored == self.num_shards:
+            return
+        if stored > 1:
+            raise ValueError(
+                f"{self.db_path} is sharded {stored} ways, not {self.num_shards}; "
+                "use rebalance_shards.py to change the shard count"
+            )
+
+        with sqlite3.connect(self.db_path) as conn:
+            # Per-user rows left in the directory file would silently disappear.
+            # Check before creating shard_config, since DDL is committed immediately
+            for table in SHARDED_TABLES:
+                if conn.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone():
+                    raise ValueError(
+                        f"{self.db_path} already holds unsharded data; "
+                        "use rebalance_shards.py to split it into shards"
+                    )
+            conn.execute("CREATE TABLE IF NOT EXISTS shard_config (num_shards INTEGER NOT NULL)")
+            conn.execute("INSERT INTO shard_config (num_shards) VALUES (?)", (self.num_shards,))
+
+    def shard_for(self, user_id: int) -> str:
+        """Get the database file holding a user's attempts, chats and stats"""
+        return self.shard_paths[user_id % self.num_shards]
+
+    def fan_out(self, query: str, params: Tuple = ()) -> List[Tuple]:
+        """Run a read query on every shard in parallel and concatenate the rows"""
+        def run(path):
+            with sqlite3.connect(path) as conn:
+                return conn.execute(query, params).fetchall()
+
+        if self.num_shards == 1:
+            return run(self.db_path)
+        if self._executor is None:
+            raise RuntimeError("DatabaseManager is closed")
+        rows = []
+        for shard_rows in self._executor.map(run, self.shard_paths):
+            rows.extend(shard_rows)
+        return rows
+
     def get_user(self, name: str) -> Optional[Tuple[int, str]]:
         """Get user by name or create if doesn't exist"""
         with sqlite3.connect(self.db_path) as conn:
@@ -31,7 +122,7 @@ class DatabaseManager:
 
     def log_attempt(self, user_id: int, problem_number: int, answer: str, is_correct: bool):
         """Log a problem attempt"""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.shard_for(user_id)) as conn:
             cursor = conn.cursor()
             
             # Update or insert user stats
@@ -54,7 +145,7 @@ class DatabaseManager:
 
     def log_chat(self, user_id: int, problem_number: int, role: str, content: str):
         """Log chat message"""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.shard_for(user_id)) as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 INSERT INTO chat_history (user_id, problem_number, role, content)
@@ -64,7 +155,7 @@ class DatabaseManager:
 
     def get_user_stats(self, user_id: int) -> List[Dict]:
         """Get user's problem statistics"""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.shard_for(user_id)) as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT problem_number, total_attempts, correct_attempts
@@ -86,7 +177,7 @@ class DatabaseManager:
 
     def get_chat_history(self, user_id: int, limit: int = 10) -> List[Dict]:
         """Get recent chat history for RAG context"""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.shard_for(user_id)) as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT problem_number, role, content, created_at
@@ -109,7 +200,7 @@ class DatabaseManager:
 
     def get_challenging_problems(self, user_id: int, limit: int = 3) -> List[int]:
         """Get problems with lowest success rate"""
-        with sqlite3.connect(self.db_path) as conn:
+        with sqlite3.connect(self.shard_for(user_id)) as conn:
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT problem_number
@@ -120,3 +211,55 @@ class DatabaseManager:
             """, (user_id, limit))
             
             return [row[0] for row in cursor.fetchall()]
+
+    def get_problem_summary(self) -> List[Dict]:
+        """Get attempt totals per problem across all users"""
+        rows = self.fan_out("""
+            SELECT problem_number, COUNT(*), SUM(total_attempts), SUM(correct_attempts)
+            FROM user_stats
+            GROUP BY problem_number
+        """)
+
+        totals = {}
+        for problem_number, users, attempts, correct in rows:
+            entry = totals.setdefault(problem_number, [0, 0, 0])
+            entry[0] += users
+            entry[1] += attempts
+            entry[2] += correct
+
+        summary = []
+        for problem_number, (users, attempts, correct) in sorted(totals.items()):
+            summary.append({
+                "problem_number": problem_number,
+                "users": users,
+                "total_attempts": attempts,
+                "correct_attempts": correct,
+                "success_rate": correct / attempts if attempts > 0 else 0
+            })
+
+        return summary
+
+    def get_banked_feedback(self, problem_number: int, answer: str) -> Optional[str]:
+        """Get vetted pre-generated feedback for a normalized wrong answer"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT feedback
+                FROM feedback_bank
+                WHERE problem_number = ? AND answer = ? AND vetted AND feedback IS NOT NULL
+            """, (problem_number, answer))
+            
+            row = cursor.fetchone()
+            return row[0] if row else None
+
+
+def reserve_shard_ids(conn: sqlite3.Connection, shard_index: int):
+    """Start a shard's AUTOINCREMENT counters at its own id range"""
+    floor = shard_index << SHARD_ID_BITS
+    for table in SHARDED_TABLES:
+        row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+        if row is None:
+            conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, floor))
+        elif row[0] < floor:
+            conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (floor, table))
+    conn.commit()
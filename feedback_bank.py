@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""Mine frequent wrong answers and pre-generate feedback for them.
+
+Each run only reads problem_attempts rows added since the previous run, adds
+their wrong answers to the feedback_bank occurrence counts, then asks the
+model for feedback on the top answers per problem that have none yet. The
+app serves vetted bank entries instead of calling the model.
+
+    python feedback_bank.py --top-k 5 --min-count 3
+
+Set OPENAI_BASE_URL (or --base-url) to run against a local mock endpoint.
+"""
+import argparse
+import json
+import os
+import re
+import sqlite3
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+from openai import OpenAI
+
+from db_utils import DatabaseManager
+
+MAX_FEEDBACK_CHARS = 1000
+
+
+def normalize_answer(answer: str) -> str:
+    """Normalize an answer so trivially different spellings share a bank entry"""
+    answer = re.sub(r"\s+", " ", str(answer).strip().lower())
+    return answer.rstrip(".")
+
+
+def known_answers(problem: Dict) -> Set[str]:
+    """Get the normalized final answers stated in a problem's solutions, e.g. '... = 4047.'"""
+    answers = set()
+    for sol in problem["solutions"]:
+        match = re.search(r"=\s*(-?[\d.,/]+?)\.?\s*$", sol["solution"])
+        if match:
+            answers.add(normalize_answer(match.group(1)))
+    return answers
+
+
+def mine_wrong_answers(db: DatabaseManager, problems: List[Dict]) -> int:
+    """Add wrong answers from attempts made since the last run; returns attempts read.
+
+    The stored is_correct flag comes from the app's loose substring check, which
+    accepts e.g. "1" for 2024^2 - 2023^2, so it is ignored here. Every answer
+    that is not a known final answer is counted, and vetting drops the ones the
+    model finds correct.
+    """
+    correct = {p["problem_number"]: known_answers(p) for p in problems}
+    processed = 0
+    for shard, path in enumerate(db.shard_paths):
+        with sqlite3.connect(db.db_path) as bank:
+            row = bank.execute(
+                "SELECT last_attempt_id FROM feedback_bank_progress WHERE shard = ?", (shard,)
+            ).fetchone()
+        last_id = row[0] if row else 0
+
+        with sqlite3.connect(path) as conn:
+            max_id, count = conn.execute(
+                "SELECT MAX(id), COUNT(*) FROM problem_attempts WHERE id > ?", (last_id,)
+            ).fetchone()
+            if not count:
+                continue
+            rows = conn.execute("""
+                SELECT problem_number, answer, COUNT(*)
+                FROM problem_attempts
+                WHERE id > ? AND id <= ? AND answer IS NOT NULL
+                GROUP BY problem_number, answer
+            """, (last_id, max_id)).fetchall()
+
+        counts: Dict[Tuple[int, str], int] = {}
+        for problem_number, answer, occurrences in rows:
+            answer = normalize_answer(answer)
+            if not answer or answer in correct.get(problem_number, ()):
+                continue
+            key = (problem_number, answer)
+            counts[key] = counts.get(key, 0) + occurrences
+
+        # Counts and progress are committed together so a failed run can be retried
+        with sqlite3.connect(db.db_path) as bank:
+            bank.executemany("""
+                INSERT INTO feedback_bank (problem_number, answer, occurrences)
+                VALUES (?, ?, ?)
+                ON CONFLICT(problem_number, answer) DO UPDATE SET
+                    occurrences = occurrences + excluded.occurrences,
+                    updated_at = CURRENT_TIMESTAMP
+            """, [(p, a, n) for (p, a), n in counts.items()])
+            bank.execute("""
+                INSERT INTO feedback_bank_progress (shard, last_attempt_id) VALUES (?, ?)
+                ON CONFLICT(shard) DO UPDATE SET last_attempt_id = excluded.last_attempt_id
+            """, (shard, max_id))
+            bank.commit()
+
+        processed += count
+
+    return processed
+
+
+def answer_from_bank(db: DatabaseManager, user_id: int, problem_number: int,
+                     answer: str) -> Optional[str]:
+    """Get banked feedback for a submission and log the exchange like evaluate_answer.
+
+    Looked up regardless of the app's correctness check: only vetted entries are
+    served, and those were confirmed wrong by the model.
+    """
+    feedback = db.get_banked_feedback(problem_number, normalize_answer(answer))
+    if feedback:
+        db.log_chat(user_id, problem_number, "user", answer)
+        db.log_chat(user_id, problem_number, "assistant", feedback)
+    return feedback
+
+
+def pending_entries(db: DatabaseManager, top_k: int, min_count: int) -> List[Tuple[int, int, str]]:
+    """Get (id, problem_number, answer) for top answers that still need feedback.
+
+    Only entries whose feedback is NULL are returned. Entries that failed vetting
+    hold the rejected text (or "") and are not retried, so the model is not asked
+    again on every run; set feedback back to NULL to regenerate one.
+    """
+    with sqlite3.connect(db.db_path) as conn:
+        return conn.execute("""
+            SELECT id, problem_number, answer
+            FROM (
+                SELECT *, ROW_NUMBER() OVER (
+                    PARTITION BY problem_number ORDER BY occurrences DESC, id
+                ) AS rank
+                FROM feedback_bank
+                WHERE occurrences >= ?
+            )
+            WHERE rank <= ? AND feedback IS NULL
+            ORDER BY problem_number, rank
+        """, (min_count, top_k)).fetchall()
+
+
+def openai_generator(client: OpenAI, model: str = "gpt-4o") -> Callable[[Dict, str], Dict]:
+    """Build a function asking the model for feedback on one wrong answer"""
+    def generate(problem: Dict, answer: str) -> Dict:
+        messages = [
+            {"role": "system", "content": """You are a helpful and encouraging math tutor. Many students give the same wrong answer to a problem. Write feedback that will be shown to any student who gives it:
+1. Confirm whether the answer is actually incorrect
+2. Explain the likely mistake behind this answer
+3. Give a helpful hint without giving away the answer
+4. Keep it concise and encouraging
+Reply with JSON: {"is_incorrect": true or false, "feedback": "..."}"""},
+            {"role": "user", "content": f"""Problem: {problem['problem']}
+Available hints:
+{json.dumps(problem['hints'], indent=2)}
+Correct solutions:
+{json.dumps(problem['solutions'], indent=2)}
+Student's answer: {answer}"""}
+        ]
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.3,
+            max_tokens=200,
+            response_format={"type": "json_object"}
+        )
+        try:
+            return json.loads(response.choices[0].message.content)
+        except (TypeError, ValueError):
+            return {}
+
+    return generate
+
+
+def vet_feedback(result: Dict) -> bool:
+    """Only serve feedback the model produced for a confirmed wrong answer"""
+    feedback = result.get("feedback")
+    return (
+        result.get("is_incorrect") is True
+        and isinstance(feedback, str)
+        and 0 < len(feedback.strip()) <= MAX_FEEDBACK_CHARS
+    )
+
+
+def refresh(db: DatabaseManager, problems: List[Dict], generate: Callable[[Dict, str], Dict],
+            top_k: int = 5, min_count: int = 3) -> Dict[str, int]:
+    """Mine new attempts and generate feedback for new frequent wrong answers"""
+    by_number = {p["problem_number"]: p for p in problems}
+    stats = {"attempts_mined": mine_wrong_answers(db, problems), "generated": 0, "vetted": 0, "failed": 0}
+
+    for entry_id, problem_number, answer in pending_entries(db, top_k, min_count):
+        problem = by_number.get(problem_number)
+        if not problem:
+            continue
+        try:
+            result = generate(problem, answer)
+        except Exception as e:
+            print(f"Problem {problem_number}, answer {answer!r}: {e}")
+            stats["failed"] += 1
+            continue
+
+        vetted = vet_feedback(result)
+        # Rejected feedback is kept for review but never served or regenerated
+        with sqlite3.connect(db.db_path) as conn:
+            conn.execute("""
+                UPDATE feedback_bank
+                SET feedback = ?, vetted = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, (str(result.get("feedback") or ""), vetted, entry_id))
+            conn.commit()
+        stats["generated"] += 1
+        stats["vetted"] += int(vetted)
+
+    return stats
+
+
+def main():
+    load_dotenv(override=True)
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default="user_data.db")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("DB_SHARDS", "1")))
+    parser.add_argument("--top-k", type=int, default=5, help="wrong answers per problem to cover")
+    parser.add_argument("--min-count", type=int, default=3, help="minimum occurrences before generating")
+    parser.add_argument("--model", default="gpt-4o")
+    parser.add_argument("--base-url", help="OpenAI-compatible endpoint, e.g. a local mock server")
+    parser.add_argument("--mine-only", action="store_true", help="update counts without calling the model")
+    args = parser.parse_args()
+
+    with open("problems.json", "r") as f:
+        problems = json.load(f)["problems"]
+
+    with DatabaseManager(args.db, num_shards=args.shards) as db:
+        if args.mine_only:
+            print(f"Mined {mine_wrong_answers(db, problems)} new attempts")
+            return
+
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), base_url=args.base_url or os.getenv("OPENAI_BASE_URL"))
+        stats = refresh(db, problems, openai_generator(client, args.model), args.top_k, args.min_count)
+        print(", ".join(f"{key}: {value}" for key, value in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""Opt-in sampling profiler for Dash callbacks.
+
+Enable it with environment variables:
+
+    PROFILE_SAMPLE_RATE  fraction of requests to profile (0-1)
+    PROFILE_SLOW_MS      always keep profiles of requests slower than this
+    PROFILE_INTERVAL_MS  stack sampling interval (default 5)
+    PROFILE_DIR          where profiles are written (default "profiles")
+
+Each kept request produces a collapsed-stack file (<id>.folded) readable by
+flamegraph.pl or speedscope, plus <id>.json with the callback name, inputs
+and duration. When neither PROFILE_SAMPLE_RATE nor PROFILE_SLOW_MS is set,
+Profiler.callback returns the callback unchanged.
+"""
+import functools
+import html
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+class StackSampler:
+    """Background thread sampling the stacks of registered threads"""
+
+    def __init__(self, interval: float, root_code=None):
+        self.interval = interval
+        self.root_code = root_code
+        self._lock = threading.Lock()
+        self._active: Dict[int, Counter] = {}
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self, thread_id: int) -> Counter:
+        """Start collecting samples for a thread"""
+        counter = Counter()
+        with self._lock:
+            self._active[thread_id] = counter
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return counter
+
+    def stop(self, thread_id: int):
+        """Stop collecting samples for a thread"""
+        with self._lock:
+            self._active.pop(thread_id, None)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                idle = not self._active
+                if idle:
+                    self._wakeup.clear()
+            if idle:
+                self._wakeup.wait()
+                continue
+
+            time.sleep(self.interval)
+            frames = sys._current_frames()
+            with self._lock:
+                for thread_id, counter in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counter[self._collapse(frame)] += 1
+
+    def _collapse(self, frame) -> str:
+        """Format a stack root-first as 'file:func;file:func;...'"""
+        names = []
+        while frame is not None and frame.f_code is not self.root_code:
+            code = frame.f_code
+            names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+
+class Profiler:
+    def __init__(self, sample_rate: float = 0.0, slow_ms: Optional[float] = None,
+                 interval_ms: float = 5.0, output_dir: str = "profiles", keep_recent: int = 200):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.output_dir = output_dir
+        self.enabled = sample_rate > 0 or slow_ms is not None
+        self.recent = deque(maxlen=keep_recent)
+        self._sampler = StackSampler(interval_ms / 1000, root_code=Profiler._invoke.__code__)
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "Profiler":
+        """Create a profiler configured from PROFILE_* environment variables"""
+        slow_ms = os.getenv("PROFILE_SLOW_MS")
+        return cls(
+            sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", "0")),
+            slow_ms=float(slow_ms) if slow_ms else None,
+            interval_ms=float(os.getenv("PROFILE_INTERVAL_MS", "5")),
+            output_dir=os.getenv("PROFILE_DIR", "profiles"),
+        )
+
+    def callback(self, fn: Callable) -> Callable:
+        """Decorator for Dash callbacks; a no-op when profiling is disabled"""
+        if not self.enabled:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return self._invoke(fn, args, kwargs)
+
+        return wrapper
+
+    def _invoke(self, fn, args, kwargs):
+        thread_id = threading.get_ident()
+        sampled = random.random() < self.sample_rate
+        counter = self._sampler.start(thread_id)
+        started_at = datetime.now()
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self._sampler.stop(thread_id)
+            slow = self.slow_ms is not None and duration_ms >= self.slow_ms
+            if sampled or slow:
+                self._save(fn.__name__, args, kwargs, started_at, duration_ms, counter, slow)
+
+    def _save(self, name: str, args, kwargs, started_at: datetime, duration_ms: float,
+              counter: Counter, slow: bool):
+        """Write the collapsed stacks and metadata for one request"""
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        profile_id = f"{started_at.strftime('%Y%m%d-%H%M%S')}-{sequence:05d}-{name}"
+
+        record = {
+            "id": profile_id,
+            "callback": name,
+            "started_at": started_at.isoformat(timespec="milliseconds"),
+            "duration_ms": round(duration_ms, 2),
+            "reason": "slow" if slow else "sampled",
+            "samples": sum(counter.values()),
+            "inputs": {"args": args, "kwargs": kwargs},
+        }
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, profile_id)
+        with open(base + ".folded", "w") as f:
+            for stack, count in counter.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(base + ".json", "w") as f:
+            json.dump(record, f, indent=2, default=str)
+
+        self.recent.append(record)
+
+    def slowest(self, limit: int = 50) -> List[Dict]:
+        """Get the slowest recently kept profiles"""
+        return sorted(self.recent, key=lambda r: r["duration_ms"], reverse=True)[:limit]
+
+    def register_routes(self, server, url_prefix: str = "/_profiles"):
+        """Serve a page listing the slowest recent requests on a Flask server"""
+        if not self.enabled:
+            return
+
+        from flask import abort, send_from_directory
+
+        def index():
+            rows = "".join(
+                "<tr><td>{duration}</td><td>{callback}</td><td>{reason}</td><td>{samples}</td>"
+                "<td>{started}</td><td><code>{inputs}</code></td>"
+                "<td><a href='{prefix}/{id}.folded'>folded</a> <a href='{prefix}/{id}.json'>json</a></td></tr>".format(
+                    duration=r["duration_ms"],
+                    callback=html.escape(r["callback"]),
+                    reason=r["reason"],
+                    samples=r["samples"],
+                    started=r["started_at"],
+                    inputs=html.escape(json.dumps(r["inputs"], default=str)[:200]),
+                    prefix=url_prefix,
+                    id=html.escape(r["id"]),
+                )
+                for r in self.slowest()
+            )
+            return (
+                "<html><head><title>Slowest requests</title></head><body>"
+                "<h1>Slowest recent requests</h1>"
+                "<table border='1' cellpadding='4'><tr><th>ms</th><th>callback</th><th>reason</th>"
+                "<th>samples</th><th>started</th><th>inputs</th><th>profile</th></tr>"
+                f"{rows}</table></body></html>"
+            )
+
+        def download(filename):
+            if not filename.endswith((".folded", ".json")):
+                abort(404)
+            return send_from_directory(os.path.abspath(self.output_dir), filename)
+
+        server.add_url_rule(url_prefix, "profiles_index", index)
+        server.add_url_rule(f"{url_prefix}/<path:filename>", "profiles_file", download)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""Split a user database into user_id-routed shards, or change its shard count."""
+import argparse
+import os
+import sqlite3
+from typing import List
+
+from db_utils import SHARDED_TABLES, DatabaseManager, shard_paths, stored_shard_count
+
+
+def _columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    """Get a table's columns except its id"""
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})") if row[1] != "id"]
+
+
+def rebalance(source_path: str, dest_path: str, num_shards: int) -> DatabaseManager:
+    """Copy source_path (sharded or not) into a new sharded database rooted at dest_path.
+
+    The caller owns the returned DatabaseManager and should close() it.
+    """
+    if os.path.abspath(source_path) == os.path.abspath(dest_path):
+        raise ValueError("destination must differ from the source database")
+    if not os.path.exists(source_path):
+        raise FileNotFoundError(source_path)
+    # Stray shard files from an earlier layout would be reused and get duplicate rows
+    dest_files = [dest_path] + (shard_paths(dest_path, num_shards) if num_shards > 1 else [])
+    for path in dest_files:
+        if os.path.exists(path):
+            raise FileExistsError(f"{path} already exists")
+
+    source_shards = stored_shard_count(source_path)
+    source_data = shard_paths(source_path, source_shards) if source_shards > 1 else [source_path]
+
+    db = None
+    try:
+        db = DatabaseManager(dest_path, num_shards=num_shards)
+
+        # User ids are kept since they decide routing
+        with sqlite3.connect(dest_path) as conn:
+            conn.execute("ATTACH DATABASE ? AS src", (source_path,))
+            conn.execute("INSERT INTO users SELECT * FROM src.users")
+            # Row ids change below, so banked feedback is kept but its counts are
+            # rebuilt by the next feedback_bank.py run. Databases created before
+            # the feedback bank existed have nothing to copy
+            has_bank = conn.execute(
+                "SELECT 1 FROM src.sqlite_master WHERE type = 'table' AND name = 'feedback_bank'"
+            ).fetchone()
+            if has_bank:
+                conn.execute("""
+                    INSERT INTO feedback_bank (id, problem_number, answer, occurrences, feedback, vetted, updated_at)
+                    SELECT id, problem_number, answer, 0, feedback, vetted, updated_at FROM src.feedback_bank
+                """)
+            conn.commit()
+
+        for index, path in enumerate(db.shard_paths):
+            with sqlite3.connect(path) as conn:
+                for source in source_data:
+                    conn.execute("ATTACH DATABASE ? AS src", (source,))
+                    for table in SHARDED_TABLES:
+                        # Rows get new ids from this shard's range; copying in id order
+                        # keeps each user's rows in their original order.
+                        # Must match DatabaseManager.shard_for; rows without a user go to shard 0
+                        columns = ", ".join(_columns(conn, table))
+                        conn.execute(
+                            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM src.{table} "
+                            "WHERE COALESCE(user_id, 0) % ? = ? ORDER BY id",
+                            (num_shards, index)
+                        )
+                    conn.commit()
+                    conn.execute("DETACH DATABASE src")
+    except BaseException:
+        # Leave nothing behind, so the run can simply be retried. Every
+        # destination file was checked above to not exist, so this run created it
+        if db is not None:
+            db.close()
+        for path in dest_files:
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("source", help="existing database, e.g. user_data.db")
+    parser.add_argument("dest", help="directory database path for the sharded layout")
+    parser.add_argument("--shards", type=int, required=True, help="number of shard files")
+    args = parser.parse_args()
+
+    with rebalance(args.source, args.dest, args.shards) as db:
+        print(f"Wrote {args.dest} and {len(db.shard_paths)} shards:")
+        for path in db.shard_paths:
+            with sqlite3.connect(path) as conn:
+                counts = [conn.execute(f"SELECT COUNT(*) FROM {t}").fetchone()[0] for t in SHARDED_TABLES]
+            print(f"  {path}: " + ", ".join(f"{t}={c}" for t, c in zip(SHARDED_TABLES, counts)))
+
+
+if __name__ == "__main__":
+    main()
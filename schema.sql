@@ -39,3 +39,21 @@ CREATE TABLE IF NOT EXISTS user_stats (
     FOREIGN KEY (user_id) REFERENCES users(id),
     UNIQUE(user_id, problem_number)
 );
+
+-- Pre-generated feedback for frequent wrong answers
+CREATE TABLE IF NOT EXISTS feedback_bank (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    problem_number INTEGER,
+    answer TEXT,  -- normalized answer
+    occurrences INTEGER DEFAULT 0,
+    feedback TEXT,  -- NULL until generated
+    vetted BOOLEAN DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE(problem_number, answer)
+);
+
+-- Last problem_attempts id mined into the feedback bank, per shard
+CREATE TABLE IF NOT EXISTS feedback_bank_progress (
+    shard INTEGER PRIMARY KEY,
+    last_attempt_id INTEGER DEFAULT 0
+);
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from db_utils import DatabaseManager
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(autouse=True)
+def project_root(monkeypatch):
+    # DatabaseManager reads schema.sql relative to the working directory
+    monkeypatch.chdir(PROJECT_ROOT)
+
+
+@pytest.fixture(autouse=True)
+def close_managers(monkeypatch):
+    """Close every DatabaseManager a test creates so fan-out threads don't pile up"""
+    managers = []
+    original_init = DatabaseManager.__init__
+
+    def tracking_init(self, *args, **kwargs):
+        managers.append(self)
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(DatabaseManager, "__init__", tracking_init)
+    yield
+    for manager in managers:
+        manager.close()
@@ -0,0 +1,218 @@
+import json
+import os
+import shutil
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("dotenv")
+
+from openai import OpenAI
+
+import feedback_bank
+from db_utils import DatabaseManager
+from rebalance_shards import rebalance
+
+with open(os.path.join(os.path.dirname(__file__), "..", "problems.json"), "r") as f:
+    PROBLEMS = json.load(f)["problems"]
+
+
+def stub_generate(calls):
+    """Accept every answer except "7", which the 'model' says is correct"""
+    def generate(problem, answer):
+        calls.append((problem["problem_number"], answer))
+        return {"is_incorrect": answer != "7", "feedback": f"Check your work on {answer}."}
+
+    return generate
+
+
+def wrong_answers(db, user_ids, problem, answer):
+    for user_id in user_ids:
+        db.log_attempt(user_id, problem, answer, False)
+
+
+def progress(db):
+    with sqlite3.connect(db.db_path) as conn:
+        return dict(conn.execute("SELECT shard, last_attempt_id FROM feedback_bank_progress"))
+
+
+@pytest.fixture
+def sharded_db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "s.db"), num_shards=2)
+    user_ids = [db.get_user(f"user_{i}")[0] for i in range(4)]
+    wrong_answers(db, user_ids, 1, "1")
+    wrong_answers(db, user_ids[:3], 1, " 1. ")
+    wrong_answers(db, user_ids, 2, "7")
+    db.log_attempt(user_ids[0], 1, "4047", True)
+    return db, user_ids
+
+
+def test_mining_is_incremental(sharded_db):
+    db, user_ids = sharded_db
+    calls = []
+
+    stats = feedback_bank.refresh(db, PROBLEMS, stub_generate(calls), min_count=3)
+    assert stats["attempts_mined"] == 12
+    first = progress(db)
+    for shard, path in enumerate(db.shard_paths):
+        with sqlite3.connect(path) as conn:
+            assert first[shard] == conn.execute("SELECT MAX(id) FROM problem_attempts").fetchone()[0]
+
+    stats = feedback_bank.refresh(db, PROBLEMS, stub_generate(calls), min_count=3)
+    assert stats["attempts_mined"] == 0
+    assert progress(db) == first
+
+    user_id = user_ids[0]
+    db.log_attempt(user_id, 1, "1", False)
+    assert feedback_bank.refresh(db, PROBLEMS, stub_generate(calls), min_count=3)["attempts_mined"] == 1
+    shard = db.shard_paths.index(db.shard_for(user_id))
+    assert progress(db)[shard] > first[shard]
+    assert progress(db)[1 - shard] == first[1 - shard]
+
+    with sqlite3.connect(db.db_path) as conn:
+        assert conn.execute(
+            "SELECT occurrences FROM feedback_bank WHERE problem_number = 1 AND answer = '1'"
+        ).fetchone()[0] == 8
+    # Each answer was only generated once across all runs
+    assert sorted(calls) == [(1, "1"), (2, "7")]
+
+
+def test_only_vetted_feedback_is_served(sharded_db):
+    db, _ = sharded_db
+    stats = feedback_bank.refresh(db, PROBLEMS, stub_generate([]), min_count=3)
+    assert stats["generated"] == 2
+    assert stats["vetted"] == 1
+
+    assert db.get_banked_feedback(1, feedback_bank.normalize_answer("1.")) == "Check your work on 1."
+    assert db.get_banked_feedback(2, "7") is None
+    assert db.get_banked_feedback(1, "42") is None
+
+
+def test_min_count_and_top_k(sharded_db):
+    db, _ = sharded_db
+    calls = []
+    feedback_bank.refresh(db, PROBLEMS, stub_generate(calls), top_k=1, min_count=5)
+    assert calls == [(1, "1")]
+
+
+def test_generation_errors_are_retried(sharded_db):
+    db, _ = sharded_db
+
+    def failing(problem, answer):
+        raise RuntimeError("API unavailable")
+
+    assert feedback_bank.refresh(db, PROBLEMS, failing, min_count=3)["failed"] == 2
+    calls = []
+    feedback_bank.refresh(db, PROBLEMS, stub_generate(calls), min_count=3)
+    assert len(calls) == 2
+
+
+def test_known_answers_come_from_numeric_solution_endings():
+    assert feedback_bank.known_answers(PROBLEMS[0]) == {"4047"}
+    assert feedback_bank.known_answers(PROBLEMS[1]) == set()
+
+
+def test_substring_matched_wrong_answer_is_served_from_bank(tmp_path):
+    db = DatabaseManager(str(tmp_path / "single.db"))
+    problem = PROBLEMS[0]
+    user_ids = [db.get_user(f"user_{i}")[0] for i in range(3)]
+    for answer in ("1", "4047"):
+        # Same loose check as submit_answer: "1" appears in the solution text
+        is_correct = any(answer in sol["solution"] for sol in problem["solutions"])
+        assert is_correct
+        for user_id in user_ids:
+            db.log_attempt(user_id, 1, answer, is_correct)
+
+    calls = []
+    feedback_bank.refresh(db, PROBLEMS, stub_generate(calls), min_count=3)
+    assert calls == [(1, "1")]
+
+    assert feedback_bank.answer_from_bank(db, user_ids[0], 1, "1") == "Check your work on 1."
+    assert feedback_bank.answer_from_bank(db, user_ids[0], 1, "4047") is None
+    history = db.get_chat_history(user_ids[0])
+    assert sorted((h["role"], h["content"]) for h in history) == [
+        ("assistant", "Check your work on 1."), ("user", "1")
+    ]
+
+
+def test_rebalance_keeps_bank_and_rebuilds_counts(sharded_db, tmp_path):
+    db, user_ids = sharded_db
+    feedback_bank.refresh(db, PROBLEMS, stub_generate([]), min_count=3)
+
+    resharded = rebalance(db.db_path, str(tmp_path / "r.db"), 3)
+    assert resharded.get_banked_feedback(1, "1") == "Check your work on 1."
+
+    calls = []
+    assert feedback_bank.refresh(resharded, PROBLEMS, stub_generate(calls), min_count=3)["attempts_mined"] == 12
+    assert calls == []
+    with sqlite3.connect(resharded.db_path) as conn:
+        assert conn.execute(
+            "SELECT occurrences FROM feedback_bank WHERE problem_number = 1 AND answer = '1'"
+        ).fetchone()[0] == 7
+
+
+def test_rebalance_database_without_bank_tables(tmp_path):
+    # The checked-in user_data.db predates the feedback bank tables
+    source = str(tmp_path / "user_data.single.db")
+    shutil.copyfile("user_data.db", source)
+
+    db = rebalance(source, str(tmp_path / "user_data.db"), 4)
+    assert sum(len(db.get_user_stats(user_id)) for user_id in (1, 2)) == 1
+
+
+class MockChatCompletions(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        MockChatCompletions.requests.append((self.path, body))
+        answer = body["messages"][-1]["content"].rsplit("Student's answer: ", 1)[1]
+        content = json.dumps({"is_incorrect": True, "feedback": f"Mock feedback for {answer}."})
+        payload = json.dumps({
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def mock_endpoint():
+    MockChatCompletions.requests = []
+    server = HTTPServer(("127.0.0.1", 0), MockChatCompletions)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    server.shutdown()
+    server.server_close()
+
+
+def test_refresh_against_mock_endpoint(sharded_db, mock_endpoint):
+    db, _ = sharded_db
+    client = OpenAI(api_key="test", base_url=mock_endpoint, max_retries=0)
+
+    stats = feedback_bank.refresh(db, PROBLEMS, feedback_bank.openai_generator(client), min_count=3)
+    assert stats == {"attempts_mined": 12, "generated": 2, "vetted": 2, "failed": 0}
+    assert db.get_banked_feedback(1, "1") == "Mock feedback for 1."
+
+    path, body = MockChatCompletions.requests[0]
+    assert path == "/v1/chat/completions"
+    assert body["model"] == "gpt-4o"
+    assert body["response_format"] == {"type": "json_object"}
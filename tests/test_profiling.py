@@ -0,0 +1,38 @@
+import os
+import time
+from datetime import datetime, timedelta
+
+from profiling import Profiler
+
+
+def test_disabled_profiler_returns_callback_unchanged():
+    def callback(n_clicks):
+        return n_clicks
+
+    assert Profiler().callback(callback) is callback
+
+
+def test_slow_request_is_saved_with_its_start_time(tmp_path):
+    profiler = Profiler(slow_ms=50, interval_ms=2, output_dir=str(tmp_path))
+
+    @profiler.callback
+    def submit_answer(n_clicks, answer):
+        time.sleep(0.2)
+        return answer
+
+    before = datetime.now()
+    assert submit_answer(1, "4047") == "4047"
+
+    [record] = profiler.slowest()
+    assert record["callback"] == "submit_answer"
+    assert record["reason"] == "slow"
+    assert record["inputs"]["args"] == (1, "4047")
+    assert datetime.fromisoformat(record["started_at"]) - before < timedelta(milliseconds=100)
+    assert os.path.exists(tmp_path / f"{record['id']}.folded")
+
+
+def test_fast_unsampled_request_is_not_saved(tmp_path):
+    profiler = Profiler(slow_ms=1000, output_dir=str(tmp_path))
+    profiler.callback(lambda: None)()
+    assert profiler.slowest() == []
+    assert os.listdir(tmp_path) == []
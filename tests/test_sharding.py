@@ -0,0 +1,130 @@
+import sqlite3
+
+import pytest
+
+from db_utils import SHARD_ID_BITS, SHARDED_TABLES, DatabaseManager
+from rebalance_shards import rebalance
+
+
+def populate(db, users=7):
+    """Give every user a few attempts and chats across two problems"""
+    user_ids = [db.get_user(f"user_{i}")[0] for i in range(users)]
+    for user_id in user_ids:
+        for problem in (1, 2):
+            db.log_attempt(user_id, problem, "1", False)
+            db.log_attempt(user_id, problem, "4047", user_id % 2 == 0)
+            db.log_chat(user_id, problem, "user", f"answer from {user_id}")
+    return user_ids
+
+
+def all_ids(db, table):
+    return [row[0] for row in db.fan_out(f"SELECT id FROM {table}")]
+
+
+def row_counts(db):
+    return {table: len(all_ids(db, table)) for table in SHARDED_TABLES}
+
+
+def test_shard_for_routes_by_user_id(tmp_path):
+    db = DatabaseManager(str(tmp_path / "s.db"), num_shards=3)
+    assert db.shard_for(3) == db.shard_paths[0]
+    assert db.shard_for(4) == db.shard_paths[1]
+    assert db.shard_for(8) == db.shard_paths[2]
+
+
+def test_rows_are_written_to_the_users_shard(tmp_path):
+    db = DatabaseManager(str(tmp_path / "s.db"), num_shards=3)
+    user_ids = populate(db)
+    for index, path in enumerate(db.shard_paths):
+        with sqlite3.connect(path) as conn:
+            owners = {row[0] for row in conn.execute("SELECT user_id FROM problem_attempts")}
+        assert owners == {u for u in user_ids if u % 3 == index}
+
+
+def test_ids_are_unique_across_shards(tmp_path):
+    db = DatabaseManager(str(tmp_path / "s.db"), num_shards=3)
+    populate(db)
+    for table in ("problem_attempts", "chat_history"):
+        ids = all_ids(db, table)
+        assert len(ids) == len(set(ids))
+    for index, path in enumerate(db.shard_paths):
+        with sqlite3.connect(path) as conn:
+            ids = [row[0] for row in conn.execute("SELECT id FROM problem_attempts")]
+        assert all(i >> SHARD_ID_BITS == index for i in ids)
+
+
+def test_problem_summary_matches_unsharded(tmp_path):
+    single = DatabaseManager(str(tmp_path / "single.db"))
+    sharded = DatabaseManager(str(tmp_path / "s.db"), num_shards=3)
+    populate(single)
+    populate(sharded)
+    assert sharded.get_problem_summary() == single.get_problem_summary()
+    assert sharded.get_problem_summary()[0]["total_attempts"] == 14
+
+
+def test_rebalance_keeps_every_row(tmp_path):
+    source = DatabaseManager(str(tmp_path / "single.db"))
+    user_ids = populate(source)
+    expected = row_counts(source)
+
+    db = rebalance(source.db_path, str(tmp_path / "s.db"), 3)
+    assert row_counts(db) == expected
+    for user_id in user_ids:
+        assert db.get_user_stats(user_id) == source.get_user_stats(user_id)
+
+    # New writes must not collide with copied rows
+    for user_id in user_ids:
+        db.log_attempt(user_id, 3, "2", False)
+    ids = all_ids(db, "problem_attempts")
+    assert len(ids) == len(set(ids)) == expected["problem_attempts"] + len(user_ids)
+
+
+def test_rebalance_changes_shard_count(tmp_path):
+    source = DatabaseManager(str(tmp_path / "s3.db"), num_shards=3)
+    user_ids = populate(source)
+    expected = row_counts(source)
+
+    db = rebalance(source.db_path, str(tmp_path / "s2.db"), 2)
+    assert row_counts(db) == expected
+    for user_id in user_ids:
+        assert db.get_user_stats(user_id) == source.get_user_stats(user_id)
+        db.log_chat(user_id, 1, "user", "after rebalance")
+    ids = all_ids(db, "chat_history")
+    assert len(ids) == len(set(ids))
+
+    with pytest.raises(ValueError, match="sharded 2 ways"):
+        DatabaseManager(db.db_path, num_shards=3)
+
+
+def test_refused_sharding_leaves_database_usable(tmp_path):
+    path = str(tmp_path / "single.db")
+    populate(DatabaseManager(path))
+
+    with pytest.raises(ValueError, match="unsharded data"):
+        DatabaseManager(path, num_shards=4)
+
+    db = DatabaseManager(path)
+    assert db.get_problem_summary()[0]["total_attempts"] == 14
+
+
+def test_rebalance_refuses_stray_shard_files(tmp_path):
+    source = DatabaseManager(str(tmp_path / "single.db"))
+    populate(source)
+    stray = tmp_path / "s.shard01.db"
+    stray.write_bytes(b"")
+
+    with pytest.raises(FileExistsError, match="shard01"):
+        rebalance(source.db_path, str(tmp_path / "s.db"), 3)
+    assert stray.exists()
+    assert not (tmp_path / "s.db").exists()
+    assert not (tmp_path / "s.shard00.db").exists()
+
+
+def test_close_shuts_down_fan_out_pool(tmp_path):
+    with DatabaseManager(str(tmp_path / "s.db"), num_shards=3) as db:
+        populate(db)
+        assert len(all_ids(db, "problem_attempts")) == 28
+        executor = db._executor
+    assert executor._shutdown
+    with pytest.raises(RuntimeError, match="closed"):
+        db.fan_out("SELECT 1")